@@ -46,7 +46,7 @@ def process_audio_segment(audio_file):
         '-b:a', '64k',
         temp_file
     ]
-    subprocess.run(ffmpeg_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    subprocess.run(ffmpeg_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     audio_segment = AudioSegment.from_mp3(temp_file)
     os.remove(temp_file)
     return audio_segment
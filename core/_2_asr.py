@@ -17,6 +17,7 @@ from core.asr_backend.demucs_vl import demucs_audio
 from core.asr_backend.audio_preprocess import process_transcription, convert_video_to_audio, split_audio, save_results, normalize_audio_volume
 from core._1_ytdlp import find_video_files
 from core.utils.models import *
+import concurrent.futures
 
 
 def is_cloud_native():
@@ -99,9 +100,16 @@ def transcribe():
     else:
         raise ValueError(f"Unsupported whisper.runtime: {runtime}. Use 'elevenlabs', or enable cloud_native mode.")
 
-    for start, end in segments:
-        result = ts(_RAW_AUDIO_FILE, vocal_audio, start, end)
-        all_results.append(result)
+    if is_cloud_native() or runtime == "cloud":
+        from videolingo_cloud.videolingo_cloud_client import CLOUD_ASR_CONCURRENCY
+        # Upload the next chunk while the server is still busy with the current one;
+        # the server runs GPU work one request at a time, so a small pool is enough
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(CLOUD_ASR_CONCURRENCY, len(segments))) as executor:
+            all_results = list(executor.map(lambda seg: ts(_RAW_AUDIO_FILE, vocal_audio, *seg), segments))
+    else:
+        for start, end in segments:
+            result = ts(_RAW_AUDIO_FILE, vocal_audio, start, end)
+            all_results.append(result)
 
     # 5. Combine results (local)
     combined_result = {'segments': []}
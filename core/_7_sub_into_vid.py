@@ -35,7 +35,7 @@ TRANS_SRT = f"{OUTPUT_DIR}/trans.srt"
     
 def check_gpu_available():
     try:
-        result = subprocess.run(['ffmpeg', '-encoders'], capture_output=True, text=True)
+        result = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'], capture_output=True, text=True)
         return 'h264_nvenc' in result.stdout
     except:
         return False
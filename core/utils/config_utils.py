@@ -1,4 +1,6 @@
 from ruamel.yaml import YAML
+import copy
+import os
 import threading
 
 CONFIG_PATH = 'config.yaml'
@@ -11,10 +13,21 @@ yaml.preserve_quotes = True
 # load & update config
 # -----------------------
 
+# Parsed config, reused until config.yaml changes on disk
+_config_cache = {}
+
+def _load_config():
+    stat = os.stat(CONFIG_PATH)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    if _config_cache.get('stamp') != stamp:
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
+            _config_cache['data'] = yaml.load(file)
+        _config_cache['stamp'] = stamp
+    return _config_cache['data']
+
 def load_key(key, default=None):
     with lock:
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
-            data = yaml.load(file)
+        data = _load_config()
 
     keys = key.split('.')
     value = data
@@ -23,6 +36,9 @@ def load_key(key, default=None):
             value = value[k]
         else:
             return default
+    # Callers may modify what they get back; don't let that leak into the cached config
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
     return value
 
 def update_key(key, new_value):
@@ -45,6 +61,7 @@ def update_key(key, new_value):
             current[keys[-1]] = new_value
             with open(CONFIG_PATH, 'w', encoding='utf-8') as file:
                 yaml.dump(data, file)
+            _config_cache.clear()
             return True
         else:
             return False
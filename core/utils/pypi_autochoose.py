@@ -43,7 +43,8 @@ def set_pip_mirror(url):
     try:
         subprocess.run([sys.executable, "-m", "pip", "config", "set", "global.index-url", url], 
                       check=True, 
-                      capture_output=True)
+                      stdout=subprocess.DEVNULL,
+                      stderr=subprocess.DEVNULL)
         return True
     except subprocess.CalledProcessError as e:
         print(f"Failed to set pip mirror: {e}")
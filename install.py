@@ -1,6 +1,7 @@
 import os, sys
 import platform
 import subprocess
+import importlib.util
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import torch for MPS detection on Apple Silicon
@@ -21,8 +22,20 @@ __     ___     _            _     _
 def install_package(*packages):
     subprocess.check_call([sys.executable, "-m", "pip", "install", *packages])
 
+def is_module_installed(module):
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ModuleNotFoundError:
+        return False
+
+def install_missing_packages(*packages):
+    """Only spawn pip for packages whose module can't be found (package name == module name)"""
+    missing = [pkg for pkg in packages if not is_module_installed(pkg)]
+    if missing:
+        install_package(*missing)
+
 def check_nvidia_gpu():
-    install_package("pynvml")
+    install_missing_packages("pynvml")
     import pynvml
     from translations.translations import translate as t
     initialized = False
@@ -65,7 +78,7 @@ def check_ffmpeg():
 
     try:
         # Check if ffmpeg is installed
-        subprocess.run(['ffmpeg', '-version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        subprocess.run(['ffmpeg', '-version'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
         console.print(Panel(t("✅ FFmpeg is already installed"), style="green"))
         return True
     except (subprocess.CalledProcessError, FileNotFoundError):
@@ -92,7 +105,7 @@ def check_ffmpeg():
         raise SystemExit(t("FFmpeg is required. Please install it and run the installer again."))
 
 def main():
-    install_package("requests", "rich", "ruamel.yaml", "InquirerPy")
+    install_missing_packages("requests", "rich", "ruamel.yaml", "InquirerPy")
     from rich.console import Console
     from rich.panel import Panel
     from rich.box import DOUBLE
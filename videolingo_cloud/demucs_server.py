@@ -379,4 +379,6 @@ if __name__ == "__main__":
     # For local testing
     port = int(os.environ.get("PORT", 8001))
     host = os.environ.get("HOST", "0.0.0.0")
-    uvicorn.run(app, host=host, port=port)
+    # Single worker: the models live in this process's GPU memory. Keep idle connections open
+    # between VideoLingo's chunk requests instead of uvicorn's 5s default
+    uvicorn.run(app, host=host, port=port, workers=1, timeout_keep_alive=75)
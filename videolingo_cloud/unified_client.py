@@ -10,6 +10,7 @@ Usage:
 
 import os
 import sys
+import random
 import requests
 import tempfile
 import time
@@ -27,7 +28,16 @@ except ImportError:
 # API Configuration
 DEFAULT_TIMEOUT = 300
 MAX_RETRIES = 3
-RETRY_DELAY = 5
+RETRY_DELAY = 2  # seconds, base of the exponential backoff
+MAX_RETRY_DELAY = 30  # seconds
+
+# Shared keep-alive session so repeated calls to the same cloud host reuse one TCP/TLS connection
+_SESSION = requests.Session()
+
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter, so a flaky link recovers quickly without hammering the server"""
+    return min(MAX_RETRY_DELAY, RETRY_DELAY * 2 ** attempt) * random.uniform(0.5, 1.0)
 
 
 def get_cloud_url() -> str:
@@ -74,7 +84,7 @@ def check_cloud_connection(url: str = None, timeout: int = 10) -> Dict[str, Any]
     
     for attempt in range(MAX_RETRIES):
         try:
-            response = requests.get(f"{url}/", timeout=timeout)
+            response = _SESSION.get(f"{url}/", timeout=timeout)
             if response.status_code == 200:
                 data = response.json()
                 rprint(f"[green]✅ Cloud service connected:[/green] {url}")
@@ -90,13 +100,13 @@ def check_cloud_connection(url: str = None, timeout: int = 10) -> Dict[str, Any]
         except requests.exceptions.Timeout:
             if attempt < MAX_RETRIES - 1:
                 rprint(f"[yellow]⚠️ Timeout, retrying... ({attempt + 1}/{MAX_RETRIES})[/yellow]")
-                time.sleep(RETRY_DELAY)
+                time.sleep(_retry_delay(attempt))
             else:
                 return {'available': False, 'error': 'Connection timeout'}
         except Exception as e:
             if attempt < MAX_RETRIES - 1:
                 rprint(f"[yellow]⚠️ Connection error, retrying... ({attempt + 1}/{MAX_RETRIES})[/yellow]")
-                time.sleep(RETRY_DELAY)
+                time.sleep(_retry_delay(attempt))
             else:
                 return {'available': False, 'error': str(e)}
     
@@ -148,7 +158,7 @@ def transcribe_audio_cloud(
                     'speaker_diarization': str(speaker_diarization).lower()
                 }
                 
-                response = requests.post(
+                response = _SESSION.post(
                     f"{url}/asr/transcribe",
                     files=files,
                     data=data,
@@ -190,17 +200,17 @@ def transcribe_audio_cloud(
             last_error = f"Cloud API timeout after {timeout}s"
             rprint(f"[yellow]⚠️ Attempt {attempt + 1}/{MAX_RETRIES} timed out[/yellow]")
             if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
+                time.sleep(_retry_delay(attempt))
         except requests.exceptions.ConnectionError:
             last_error = f"Cannot connect to cloud API at {url}"
             rprint(f"[yellow]⚠️ Attempt {attempt + 1}/{MAX_RETRIES} connection failed[/yellow]")
             if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
+                time.sleep(_retry_delay(attempt))
         except Exception as e:
             last_error = str(e)
             rprint(f"[yellow]⚠️ Attempt {attempt + 1}/{MAX_RETRIES} failed: {last_error}[/yellow]")
             if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
+                time.sleep(_retry_delay(attempt))
     
     raise Exception(f"Cloud transcription failed after {MAX_RETRIES} attempts: {last_error}")
 
@@ -238,7 +248,7 @@ def separate_audio_cloud(
                 files = {'audio': (os.path.basename(audio_file), f, 'audio/wav')}
                 data = {'return_files': 'true'}
                 
-                response = requests.post(
+                response = _SESSION.post(
                     f"{url}/separation/separate",
                     files=files,
                     data=data,
@@ -279,17 +289,17 @@ def separate_audio_cloud(
             last_error = f"Cloud API timeout after {timeout}s"
             rprint(f"[yellow]⚠️ Attempt {attempt + 1}/{MAX_RETRIES} timed out[/yellow]")
             if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
+                time.sleep(_retry_delay(attempt))
         except requests.exceptions.ConnectionError:
             last_error = f"Cannot connect to cloud API at {url}"
             rprint(f"[yellow]⚠️ Attempt {attempt + 1}/{MAX_RETRIES} connection failed[/yellow]")
             if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
+                time.sleep(_retry_delay(attempt))
         except Exception as e:
             last_error = str(e)
             rprint(f"[yellow]⚠️ Attempt {attempt + 1}/{MAX_RETRIES} failed: {last_error}[/yellow]")
             if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
+                time.sleep(_retry_delay(attempt))
     
     raise Exception(f"Cloud separation failed after {MAX_RETRIES} attempts: {last_error}")
 
@@ -10,23 +10,19 @@ Endpoints:
 Deploy on GPU cloud platforms (Colab, Kaggle, etc.)
 """
 
-SERVER_VERSION = "2.3.5"
+SERVER_VERSION = "2.5.0"
 
 import os
-import sys
-import builtins
 
 # Set matplotlib backend to Agg before importing any matplotlib-dependent libraries
 os.environ['MPLBACKEND'] = 'Agg'
 
-# Monkey patch builtins.open
-_original_open = open
-def _patched_open(*args, **kwargs):
-    return _original_open(*args, **kwargs)
-builtins.open = _patched_open
-
 import io
+import json
+import asyncio
 import base64
+import hashlib
+import shutil
 import tempfile
 import warnings
 import time
@@ -34,6 +30,7 @@ from typing import Optional, Union, Any
 from contextlib import asynccontextmanager
 
 import torch
+import torchaudio
 
 # Patch torch.load for PyTorch 2.6+ compatibility
 _original_torch_load = torch.load
@@ -41,15 +38,15 @@ def _patched_torch_load(*args, **kwargs):
     kwargs['weights_only'] = False
     return _original_torch_load(*args, **kwargs)
 torch.load = _patched_torch_load
-import sys
-sys.modules['torch'].load = _patched_torch_load
 
 import whisperx
 import librosa
+import soundfile as sf
 import numpy as np
 from fastapi import FastAPI, File, Form, UploadFile, HTTPException, APIRouter, Security, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel, Field
 import uvicorn
 
@@ -62,7 +59,8 @@ def vprint(*args, **kwargs):
 # Demucs imports
 try:
     from demucs.pretrained import get_model
-    from demucs.audio import save_audio
+    from demucs.audio import prevent_clip, i16_pcm
+    import lameenc
     from demucs.apply import apply_model
     from demucs.hdemucs import HDemucs
     DEMUC_AVAILABLE = True
@@ -71,22 +69,31 @@ except ImportError:
     vprint("⚠️ Demucs not available, separation service disabled")
 
 import gc
+from collections import OrderedDict
 
 warnings.filterwarnings("ignore")
 
 # Global caches
-whisper_model_cache = {}
+# Each Whisper model (one per language) pins ~3GB of VRAM for large-v3; keep only the most recently used
+whisper_model_cache = OrderedDict()
 demucs_model_cache = {}
-align_model_cache = {}
+# Alignment models are wav2vec2 checkpoints (~0.4-1.2GB each); keep the most recently used few on device
+align_model_cache = OrderedDict()
+MAX_ALIGN_MODELS = 3
 diarize_model_cache = {}
+resampler_cache = {}
 device = None
 compute_type = None
+# Whisper model preloaded at startup
+DEFAULT_MODEL = os.environ.get("DEFAULT_MODEL", "large-v3")
+# Requests decode and encode on worker threads concurrently, but share one GPU for inference
+gpu_lock = asyncio.Lock()
 
 def get_device():
     """Smart device detection: CUDA -> MPS -> CPU"""
     if torch.cuda.is_available():
-        # Prefer float16 for CUDA GPUs, only use int8 if necessary
-        return "cuda", "float16"
+        # bfloat16 on Ampere+ (same speed as float16 with float32's range); T4/V100 stay on float16
+        return "cuda", "bfloat16" if torch.cuda.get_device_capability(0)[0] >= 8 else "float16"
     elif torch.backends.mps.is_available():
         return "mps", "float16"
     else:
@@ -165,11 +172,28 @@ class HealthResponse(BaseModel):
 
 # ============== Model Loading ==============
 
+def evict_whisper_models(cache: OrderedDict):
+    """Drop least recently used Whisper models so a new one fits (2 on CUDA, 1 elsewhere)"""
+    max_models = 2 if device == "cuda" else 1
+    if len(cache) < max_models:
+        return
+    while len(cache) >= max_models:
+        # Delete by key rather than popitem() so no local keeps the evicted model alive
+        evicted = next(iter(cache))
+        del cache[evicted]
+        vprint(f"🗑️ Evicting Whisper model: {evicted}")
+    gc.collect()
+    if device == "cuda":
+        torch.cuda.empty_cache()
+
 def get_or_load_whisper_model(model_name: str, language: Optional[str] = None, batch_size: int = 16):
     """Load or retrieve cached Whisper model"""
     cache_key = f"{model_name}_{language}_{compute_type}"
     
-    if cache_key not in whisper_model_cache:
+    if cache_key in whisper_model_cache:
+        whisper_model_cache.move_to_end(cache_key)
+    else:
+        evict_whisper_models(whisper_model_cache)
         vprint(f"📥 Loading Whisper model: {model_name} (compute_type: {compute_type})...")
         vad_options = {"vad_onset": 0.500, "vad_offset": 0.363}
         asr_options = {"temperatures": [0], "initial_prompt": ""}
@@ -198,9 +222,26 @@ def get_or_load_demucs_model():
 
     return demucs_model_cache['htdemucs']
 
+def get_or_load_resampler(orig_sr: int, target_sr: int):
+    """Load or retrieve cached resampler (its filter kernel is built once per rate pair)"""
+    key = (orig_sr, target_sr)
+    if key not in resampler_cache:
+        resampler_cache[key] = torchaudio.transforms.Resample(orig_sr, target_sr).to(device)
+    return resampler_cache[key]
+
 def get_or_load_align_model(language_code: str):
-    """Load or retrieve cached alignment model"""
-    if language_code not in align_model_cache:
+    """Load or retrieve cached alignment model (LRU, at most MAX_ALIGN_MODELS)"""
+    if language_code in align_model_cache:
+        align_model_cache.move_to_end(language_code)
+    else:
+        if len(align_model_cache) >= MAX_ALIGN_MODELS:
+            # Delete by key rather than popitem() so no local keeps the evicted model alive through the load
+            evicted = next(iter(align_model_cache))
+            del align_model_cache[evicted]
+            vprint(f"🗑️ Evicting alignment model: {evicted}")
+            gc.collect()
+            if device == "cuda":
+                torch.cuda.empty_cache()
         vprint(f"📥 Loading alignment model for: {language_code}...")
         align_model, align_metadata = whisperx.load_align_model(
             language_code=language_code, device=device
@@ -230,19 +271,235 @@ def get_or_load_diarize_model():
             raise e
     return diarize_model_cache['diarize']
 
+# ============== Response Cache ==============
+
+# Re-runs of the VideoLingo pipeline re-send identical segments; whisper runs at temperature 0,
+# so the same audio + params always produce the same transcription
+ASR_CACHE_DIR = os.path.join(tempfile.gettempdir(), "videolingo_asr_cache")
+MAX_ASR_CACHE_ENTRIES = 512
+
+def get_asr_cache_key(audio_file, *params) -> str:
+    """Hash the uploaded audio (read in chunks, then rewound) together with the request params"""
+    h = hashlib.blake2b(digest_size=16)
+    for chunk in iter(lambda: audio_file.read(1 << 20), b""):
+        h.update(chunk)
+    audio_file.seek(0)
+    h.update(repr(params).encode())
+    return h.hexdigest()
+
+def load_asr_cache(cache_key: str) -> Optional[dict]:
+    path = os.path.join(ASR_CACHE_DIR, f"{cache_key}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    # Touch on a hit so trimming in save_asr_cache evicts least-recently-used entries
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return cached
+
+def save_asr_cache(cache_key: str, response: BaseModel):
+    try:
+        os.makedirs(ASR_CACHE_DIR, exist_ok=True)
+        path = os.path.join(ASR_CACHE_DIR, f"{cache_key}.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(response.model_dump_json())
+        os.replace(path + ".tmp", path)
+
+        # Keep the directory bounded, dropping the least recently used entries first
+        entries = sorted(os.scandir(ASR_CACHE_DIR), key=lambda e: e.stat().st_mtime)
+        for entry in entries[:-MAX_ASR_CACHE_ENTRIES]:
+            os.unlink(entry.path)
+    except Exception as e:
+        vprint(f"⚠️ Failed to cache transcription: {e}")
+
 # ============== Audio Processing ==============
 
-def process_audio(audio_bytes: bytes):
-    """Load and preprocess audio"""
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-        tmp.write(audio_bytes)
-        tmp_path = tmp.name
+def process_audio(audio_file):
+    """Load and preprocess audio from a binary file object (e.g. UploadFile.file)"""
+    try:
+        # Decode straight from the upload (wav/flac/ogg, and mp3 with libsndfile >= 1.1)
+        audio, sr = sf.read(audio_file, dtype='float32', always_2d=False)
+    except RuntimeError:
+        # Formats libsndfile can't read (m4a, aac, ...) decode in-process through torchaudio's sox/ffmpeg bindings
+        audio_file.seek(0)
+        try:
+            wav, sr = torchaudio.load(audio_file)
+            audio = wav.numpy().T
+        except Exception:
+            # Last resort: librosa's audioread path spawns ffmpeg and needs a file on disk
+            audio_file.seek(0)
+            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+                shutil.copyfileobj(audio_file, tmp)
+                tmp_path = tmp.name
+            try:
+                audio, sr = librosa.load(tmp_path, sr=16000, mono=True)
+                return audio
+            finally:
+                os.unlink(tmp_path)
+
+    # Same 16kHz mono output librosa.load(sr=16000, mono=True) produced
+    if audio.ndim == 2:
+        audio = audio.mean(axis=1)
+    if sr != 16000:
+        audio = librosa.resample(audio, orig_sr=sr, target_sr=16000)
+    return audio
+
+def encode_audio(wav: torch.Tensor, samplerate: int, audio_format: str = "mp3") -> bytes:
+    """Encode a [channels, time] tensor in memory (same settings demucs' save_audio used)"""
+    wav = prevent_clip(wav, mode="rescale")
+    if audio_format == "wav":
+        buf = io.BytesIO()
+        sf.write(buf, wav.t().numpy(), samplerate, format="WAV", subtype="PCM_16")
+        return buf.getvalue()
+
+    # MP3 keeps the base64 response ~10x smaller than WAV, which matters over ngrok
+    encoder = lameenc.Encoder()
+    encoder.set_bit_rate(128)
+    encoder.set_in_sample_rate(samplerate)
+    encoder.set_channels(wav.shape[0])
+    encoder.set_quality(2)
+    encoder.silence()
+    pcm = i16_pcm(wav).t().contiguous().numpy()
+    return encoder.encode(pcm.tobytes()) + encoder.flush()
+
+def warmup_models():
+    """Run tiny dummy inferences so CUDA kernels and allocator pools are ready before the first request"""
+    if device != "cuda":
+        return
+    vprint("🔥 Warming up models...")
+    try:
+        # Silence has no VAD speech, but language detection still runs the Whisper encoder once
+        get_or_load_whisper_model(DEFAULT_MODEL).transcribe(np.zeros(16000, dtype=np.float32), batch_size=1)
+        if DEMUC_AVAILABLE:
+            model = get_or_load_demucs_model()
+            with torch.inference_mode():
+                apply_model(model, torch.zeros(1, 2, model.samplerate, device=device), device=device, shifts=0, split=True, overlap=0)
+        torch.cuda.synchronize()
+        vprint("✅ Warmup done")
+    except Exception as e:
+        vprint(f"⚠️ Warmup failed (first request will be slower): {e}")
+
+# ============== Inference ==============
+
+def default_batch_size() -> int:
+    """Pick the Whisper batch size from the GPU memory free right now, with cached models already resident"""
+    if device == "cuda":
+        free_mem, _ = torch.cuda.mem_get_info()
+        # Blocks held by PyTorch's caching allocator are reusable, so count them as free
+        free_mem += torch.cuda.memory_reserved() - torch.cuda.memory_allocated()
+        free_gb = free_mem / (1024**3)
+        return 32 if free_gb > 20 else 16 if free_gb > 8 else 8 if free_gb > 4 else 4
+    elif device == "mps":
+        return 4
+    return 1
+
+@torch.inference_mode()
+def run_transcription(audio_array, language, model, batch_size, align, speaker_diarization, min_speakers, max_speakers):
+    """Transcribe, align and diarize a decoded 16kHz array (blocking; run on a worker thread)"""
+    whisper_model = get_or_load_whisper_model(model, language, batch_size)
+    if batch_size is None:
+        batch_size = default_batch_size()
+    vprint(f"📐 Batch size: {batch_size}")
+    
+    vprint("🎯 Transcribing...")
+    result = whisper_model.transcribe(audio_array, batch_size=batch_size)
+    detected_language = result.get("language", language or "unknown")
+    segments = result.get("segments", [])
     
+    # Word alignment
+    word_segments = None
+    if align and segments:
+        vprint("🔄 Aligning words...")
+        align_model, align_metadata = get_or_load_align_model(detected_language)
+        result_aligned = whisperx.align(
+            segments, align_model, align_metadata, audio_array, device,
+            return_char_alignments=False
+        )
+        segments = result_aligned.get("segments", [])
+        word_segments = result_aligned.get("word_segments", [])
+    
+    # Speaker diarization
+    speakers = None
+    if speaker_diarization:
+        vprint("🎭 Speaker diarization...")
+        diarize_model = get_or_load_diarize_model()
+        diarize_kwargs = {}
+        if min_speakers is not None:
+            diarize_kwargs['min_speakers'] = min_speakers
+        if max_speakers is not None:
+            diarize_kwargs['max_speakers'] = max_speakers
+        diarize_segments = diarize_model(audio_array, **diarize_kwargs)
+        
+        # Create result dict with word segments for speaker assignment
+        result_for_diarization = {"segments": segments}
+        if word_segments:
+            result_for_diarization["word_segments"] = word_segments
+        
+        result_diarized = whisperx.assign_word_speakers(diarize_segments, result_for_diarization)
+        segments = result_diarized.get("segments", [])
+        speakers = list(set(seg.get("speaker", "UNKNOWN") for seg in segments if "speaker" in seg))
+        
+        if speakers:
+            vprint(f"✅ Detected speakers: {speakers}")
+        else:
+            vprint("⚠️ No speakers detected")
+    
+    return detected_language, segments, word_segments, speakers
+
+def run_separation(audio_file, fast: bool):
+    """Split audio from a binary file object into vocals and background [channels, time] CPU tensors (blocking; run on a worker thread)"""
+    model = get_or_load_demucs_model()
+
+    vprint("🎵 Separating audio...")
+    # Decode straight from the upload like process_audio; torchaudio covers what libsndfile can't read
     try:
-        audio, sr = librosa.load(tmp_path, sr=16000, mono=True)
-        return audio
-    finally:
-        os.unlink(tmp_path)
+        audio, sr = sf.read(audio_file, dtype='float32', always_2d=True)
+        wav = torch.from_numpy(audio.T)
+    except RuntimeError:
+        audio_file.seek(0)
+        wav, sr = torchaudio.load(audio_file)
+    wav = wav.to(device)
+
+    # Ensure stereo (2 channels) for demucs
+    if wav.shape[0] == 1:
+        vprint("⚠️ Input is mono, converting to stereo...")
+        wav = wav.repeat(2, 1)  # Repeat mono to stereo
+    elif wav.shape[0] > 2:
+        vprint("⚠️ Input has more than 2 channels, using first 2...")
+        wav = wav[:2, :]
+
+    # Resample to model's expected sample rate if needed
+    if sr != model.samplerate:
+        vprint(f"⚠️ Resampling from {sr}Hz to {model.samplerate}Hz...")
+        wav = get_or_load_resampler(sr, model.samplerate)(wav)
+
+    # Apply separation (inference_mode also skips the autograd version counters no_grad keeps)
+    with torch.inference_mode():
+        # wav shape: [channels, time]
+        # add batch dimension for demucs: [batch, channels, time]
+        wav = wav[None]
+        # Clips shorter than one model segment are already a single chunk, so overlap only
+        # costs on long inputs; fast mode trades a little quality for fewer overlapping passes
+        if fast:
+            sources = apply_model(model, wav, device=device, shifts=0, split=True, overlap=0.1)
+        else:
+            sources = apply_model(model, wav, device=device, shifts=1, split=True, overlap=0.25)
+        # sources shape: [batch, sources, channels, time]
+        sources = sources.squeeze(0).cpu()  # Remove batch dimension
+
+    # Source order comes from the model; for htdemucs: drums, bass, other, vocals
+    vocals_idx = model.sources.index('vocals')
+    vocals = sources[vocals_idx]
+
+    # Background is everything except vocals, summed in one reduction
+    mask = torch.ones(len(model.sources), dtype=torch.bool)
+    mask[vocals_idx] = False
+    background = sources[mask].sum(dim=0)
+    return vocals, background, model.samplerate
 
 # ============== Lifespan ==============
 
@@ -259,6 +516,8 @@ async def lifespan(app: FastAPI):
         gpu_mem = torch.cuda.get_device_properties(0).total_memory / (1024**3)
         vprint(f"🚀 Using CUDA GPU: {torch.cuda.get_device_name(0)}")
         vprint(f"💾 GPU Memory: {gpu_mem:.2f} GB")
+        # TF32 matmuls on Ampere+ (htdemucs transformer, wav2vec2 alignment); cuDNN convs already default to TF32
+        torch.set_float32_matmul_precision("high")
     elif device == "mps":
         vprint(f"🍎 Using Apple Silicon MPS")
     else:
@@ -267,7 +526,8 @@ async def lifespan(app: FastAPI):
     
     # Preload models
     vprint("📦 Preloading models...")
-    get_or_load_whisper_model("large-v3")
+    load_start = time.time()
+    get_or_load_whisper_model(DEFAULT_MODEL)
     if DEMUC_AVAILABLE:
         get_or_load_demucs_model()
     
@@ -284,7 +544,9 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         vprint(f"⚠️ Failed to preload diarization model: {e}")
         
-    vprint("✅ All models loaded!\n")
+    vprint(f"✅ All models loaded in {time.time() - load_start:.1f}s!\n")
+
+    warmup_models()
     
     yield
     
@@ -292,6 +554,9 @@ async def lifespan(app: FastAPI):
     vprint("Cleaning up...")
     whisper_model_cache.clear()
     demucs_model_cache.clear()
+    align_model_cache.clear()
+    diarize_model_cache.clear()
+    resampler_cache.clear()
     if device == "cuda":
         torch.cuda.empty_cache()
 
@@ -312,6 +577,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Word-level JSON compresses several times over; requests sends Accept-Encoding: gzip by default.
+# Level 1 keeps multi-MB separation responses from stalling the event loop while compressing
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=1)
+
 # ============== Routers ==============
 
 # ASR Router
@@ -338,78 +607,48 @@ async def transcribe(
     
     vprint(f"🔧 Parsed params: align={align}, speaker_diarization={speaker_diarization}, min_speakers={min_speakers}, max_speakers={max_speakers}")
     
-    if batch_size is None:
-        if device == "cuda":
-            gpu_mem = torch.cuda.get_device_properties(0).total_memory / (1024**3)
-            batch_size = 16 if gpu_mem > 8 else 4
-        elif device == "mps":
-            batch_size = 4
-        else:
-            batch_size = 1
-    
     try:
-        audio_bytes = await audio.read()
-        audio_array = process_audio(audio_bytes)
-        
-        whisper_model = get_or_load_whisper_model(model, language, batch_size)
-        
-        vprint("🎯 Transcribing...")
-        result = whisper_model.transcribe(audio_array, batch_size=batch_size)
-        detected_language = result.get("language", language or "unknown")
-        segments = result.get("segments", [])
-        
-        # Word alignment
-        word_segments = None
-        if align and segments:
-            vprint("🔄 Aligning words...")
-            align_model, align_metadata = get_or_load_align_model(detected_language)
-            result_aligned = whisperx.align(
-                segments, align_model, align_metadata, audio_array, device,
-                return_char_alignments=False
-            )
-            segments = result_aligned.get("segments", [])
-            word_segments = result_aligned.get("word_segments", [])
-        
-        # Speaker diarization
-        speakers = None
-        if speaker_diarization:
-            vprint("🎭 Speaker diarization...")
-            diarize_model = get_or_load_diarize_model()
-            diarize_kwargs = {}
-            if min_speakers is not None:
-                diarize_kwargs['min_speakers'] = min_speakers
-            if max_speakers is not None:
-                diarize_kwargs['max_speakers'] = max_speakers
-            diarize_segments = diarize_model(audio_array, **diarize_kwargs)
-            
-            # Create result dict with word segments for speaker assignment
-            result_for_diarization = {"segments": segments}
-            if word_segments:
-                result_for_diarization["word_segments"] = word_segments
-            
-            result_diarized = whisperx.assign_word_speakers(diarize_segments, result_for_diarization)
-            segments = result_diarized.get("segments", [])
-            speakers = list(set(seg.get("speaker", "UNKNOWN") for seg in segments if "speaker" in seg))
-            
-            if speakers:
-                vprint(f"✅ Detected speakers: {speakers}")
-            else:
-                vprint("⚠️ No speakers detected")
+        loop = asyncio.get_running_loop()
+        cache_key = await loop.run_in_executor(
+            None, get_asr_cache_key, audio.file, language, model, align, speaker_diarization, min_speakers, max_speakers
+        )
+        cached = await loop.run_in_executor(None, load_asr_cache, cache_key)
+        if cached is not None:
+            vprint("♻️ Returning cached transcription")
+            cached["processing_time"] = time.time() - start_time
+            return TranscriptionResponse(**cached)
+
+        # Decode on a worker thread so the event loop keeps receiving uploads and answering health checks
+        audio_array = await loop.run_in_executor(None, process_audio, audio.file)
         
-        processing_time = time.time() - start_time
+        async with gpu_lock:
+            # A client that timed out while queued retries the same upload; once the abandoned
+            # request finishes, answer the retry from its cached result instead of transcribing twice
+            cached = await loop.run_in_executor(None, load_asr_cache, cache_key)
+            if cached is None:
+                detected_language, segments, word_segments, speakers = await loop.run_in_executor(
+                    None, run_transcription, audio_array, language, model, batch_size,
+                    align, speaker_diarization, min_speakers, max_speakers
+                )
+                processing_time = time.time() - start_time
+                
+                response = TranscriptionResponse(
+                    success=True, language=detected_language, segments=segments,
+                    word_segments=word_segments, speakers=speakers,
+                    processing_time=processing_time, device=device, model=model
+                )
+                # Save before releasing the lock so a queued duplicate sees it
+                await loop.run_in_executor(None, save_asr_cache, cache_key, response)
         
-        return TranscriptionResponse(
-            success=True, language=detected_language, segments=segments,
-            word_segments=word_segments, speakers=speakers,
-            processing_time=processing_time, device=device, model=model
-        )
+        if cached is not None:
+            vprint("♻️ Returning cached transcription")
+            cached["processing_time"] = time.time() - start_time
+            return TranscriptionResponse(**cached)
+        return response
         
     except Exception as e:
         vprint(f"❌ Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if device == "cuda":
-            torch.cuda.empty_cache()
 
 # Separation Router
 separation_router = APIRouter(prefix="/separation", tags=["Separation - Demucs"])
@@ -417,111 +656,52 @@ separation_router = APIRouter(prefix="/separation", tags=["Separation - Demucs"]
 @separation_router.post("/separate", response_model=SeparationResponse, dependencies=[Depends(verify_token)])
 async def separate_audio(
     audio: UploadFile = File(...),
-    return_files: bool = True
+    return_files: bool = True,
+    audio_format: str = Form("mp3"),
+    fast: Union[bool, str] = Form(False)
 ):
     """Separate audio into vocals and background using Demucs"""
     if not DEMUC_AVAILABLE:
         raise HTTPException(status_code=503, detail="Demucs service not available")
+    if audio_format not in ("mp3", "wav"):
+        raise HTTPException(status_code=400, detail="audio_format must be 'mp3' or 'wav'")
+    fast = parse_bool(fast)
     
     start_time = time.time()
     
     try:
-        audio_bytes = await audio.read()
+        loop = asyncio.get_running_loop()
+        async with gpu_lock:
+            vocals, background, samplerate = await loop.run_in_executor(None, run_separation, audio.file, fast)
+
+        # Encode in memory and base64 for the response
+        vocals_base64 = None
+        background_base64 = None
+
+        if return_files:
+            def to_base64(wav):
+                return base64.b64encode(encode_audio(wav, samplerate, audio_format)).decode('utf-8')
+
+            # MP3 encoding a long track takes seconds; run it in worker threads so the event loop
+            # keeps answering health checks meanwhile
+            vocals_base64, background_base64 = await asyncio.gather(
+                loop.run_in_executor(None, to_base64, vocals),
+                loop.run_in_executor(None, to_base64, background)
+            )
         
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_input:
-            tmp_input.write(audio_bytes)
-            input_path = tmp_input.name
+        # Cleanup
+        del vocals, background
+        gc.collect()
+        if device == "cuda":
+            torch.cuda.empty_cache()
         
-        try:
-            model = get_or_load_demucs_model()
-
-            vprint("🎵 Separating audio...")
-            # Load audio file
-            from torchaudio import load as torchaudio_load
-            from torchaudio import transforms as T
-            wav, sr = torchaudio_load(input_path)
-            wav = wav.to(device)
-
-            # Ensure stereo (2 channels) for demucs
-            if wav.shape[0] == 1:
-                vprint("⚠️ Input is mono, converting to stereo...")
-                wav = wav.repeat(2, 1)  # Repeat mono to stereo
-            elif wav.shape[0] > 2:
-                vprint("⚠️ Input has more than 2 channels, using first 2...")
-                wav = wav[:2, :]
-
-            # Resample to model's expected sample rate if needed
-            if sr != model.samplerate:
-                vprint(f"⚠️ Resampling from {sr}Hz to {model.samplerate}Hz...")
-                resampler = T.Resample(sr, model.samplerate).to(device)
-                wav = resampler(wav)
-
-            # Apply separation
-            with torch.no_grad():
-                # wav shape: [channels, time]
-                # add batch dimension for demucs: [batch, channels, time]
-                wav = wav.unsqueeze(0)
-                sources = apply_model(model, wav, device=device, shifts=1, split=True, overlap=0.25)
-                # sources shape: [batch, sources, channels, time]
-                sources = sources.squeeze(0).cpu()  # Remove batch dimension
-
-            # Get source names from the model
-            # For htdemucs: drums, bass, other, vocals
-            sources_dict = {}
-            for i, src_name in enumerate(model.sources):
-                sources_dict[src_name] = sources[i]
-
-            kwargs = {
-                "samplerate": model.samplerate, "bitrate": 128, "preset": 2,
-                "clip": "rescale", "as_float": False, "bits_per_sample": 16
-            }
-
-            # Save vocals
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp_v:
-                vocals_path = tmp_v.name
-            save_audio(sources_dict['vocals'], vocals_path, **kwargs)
-
-            # Save background (everything except vocals)
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp_b:
-                bg_path = tmp_b.name
-            background = sum(sources_dict[src] for src in sources_dict if src != 'vocals')
-            save_audio(background, bg_path, **kwargs)
-            
-            # Encode to base64
-            vocals_base64 = None
-            background_base64 = None
-            
-            if return_files:
-                with open(vocals_path, 'rb') as f:
-                    vocals_base64 = base64.b64encode(f.read()).decode('utf-8')
-                with open(bg_path, 'rb') as f:
-                    background_base64 = base64.b64encode(f.read()).decode('utf-8')
-            
-            # Cleanup
-            del sources, sources_dict, background
-            gc.collect()
-            if device == "cuda":
-                torch.cuda.empty_cache()
-            
-            processing_time = time.time() - start_time
-            
-            for f in [input_path, vocals_path, bg_path]:
-                try:
-                    os.unlink(f)
-                except:
-                    pass
-            
-            return SeparationResponse(
-                success=True, vocals_base64=vocals_base64,
-                background_base64=background_base64,
-                processing_time=processing_time, device=device
-            )
-            
-        finally:
-            try:
-                os.unlink(input_path)
-            except:
-                pass
+        processing_time = time.time() - start_time
+        
+        return SeparationResponse(
+            success=True, vocals_base64=vocals_base64,
+            background_base64=background_base64,
+            processing_time=processing_time, device=device
+        )
                 
     except Exception as e:
         vprint(f"❌ Error: {str(e)}")
@@ -568,6 +748,7 @@ async def clear_cache():
     demucs_model_cache.clear()
     align_model_cache.clear()
     diarize_model_cache.clear()
+    resampler_cache.clear()
     if device == "cuda":
         torch.cuda.empty_cache()
     return {"status": "All caches cleared"}
@@ -585,7 +766,9 @@ def run_server(host="0.0.0.0", port=8000):
         nest_asyncio.apply()
     except ImportError:
         pass
-    uvicorn.run(app, host=host, port=port)
+    # Single worker: the models live in this process's GPU memory. Keep idle connections open
+    # between VideoLingo's chunk requests instead of uvicorn's 5s default
+    uvicorn.run(app, host=host, port=port, workers=1, timeout_keep_alive=75)
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
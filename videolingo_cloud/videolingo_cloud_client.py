@@ -9,11 +9,21 @@ Usage:
 """
 
 import os
+import io
 import sys
+import json
+import mimetypes
+import subprocess
+import random
+import hashlib
+import shutil
 import requests
+import numpy as np
+import soundfile as sf
 import tempfile
+import threading
 import time
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from rich import print as rprint
 
 # Try to import VideoLingo utils
@@ -41,7 +51,159 @@ except ImportError:
 # API Configuration
 DEFAULT_TIMEOUT = 300  # 5 minutes timeout for transcription
 MAX_RETRIES = 3
-RETRY_DELAY = 5  # seconds
+RETRY_DELAY = 2  # seconds, base of the exponential backoff
+MAX_RETRY_DELAY = 30  # seconds
+# Chunk requests the pipeline keeps in flight; the server runs them one at a time on its GPU
+CLOUD_ASR_CONCURRENCY = 2
+# Wire format for cut chunk windows: 'opus' (speech-tuned, ~10x smaller than WAV) or 'flac' (lossless)
+UPLOAD_CODEC = "opus"
+
+# Shared keep-alive session: the health check and every segment upload go to the same
+# ngrok host, so reuse one TCP/TLS connection instead of handshaking per request
+_SESSION = requests.Session()
+
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter, so a flaky link recovers quickly without hammering the server"""
+    return min(MAX_RETRY_DELAY, RETRY_DELAY * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+# On-disk transcription cache, so re-running the pipeline on unchanged audio skips the upload
+ASR_CACHE_DIR = os.path.join(tempfile.gettempdir(), "videolingo_cloud_asr_cache")
+MAX_ASR_CACHE_ENTRIES = 512
+
+# Source-file digests by (path, mtime, size): every segment of a run keys on the same long audio file
+_FILE_DIGESTS: Dict[Tuple[str, int, int], bytes] = {}
+_FILE_DIGESTS_LOCK = threading.Lock()
+
+
+def _file_digest(audio_file: str) -> bytes:
+    """Hash the file once per (path, mtime, size); concurrent callers wait for the first hash instead of re-reading"""
+    st = os.stat(audio_file)
+    key = (os.path.abspath(audio_file), st.st_mtime_ns, st.st_size)
+    with _FILE_DIGESTS_LOCK:
+        if key not in _FILE_DIGESTS:
+            h = hashlib.blake2b(digest_size=16)
+            with open(audio_file, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+            _FILE_DIGESTS[key] = h.digest()
+        return _FILE_DIGESTS[key]
+
+
+def get_asr_cache_key(audio_file: str, *params) -> str:
+    """Hash the source audio file together with the request params (window bounds and codec included)"""
+    h = hashlib.blake2b(_file_digest(audio_file), digest_size=16)
+    h.update(repr(params).encode())
+    return h.hexdigest()
+
+
+def load_asr_cache(cache_key: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(ASR_CACHE_DIR, f"{cache_key}.json")
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    # Touch on a hit so trimming in save_asr_cache evicts least-recently-used entries
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return cached
+
+
+def save_asr_cache(cache_key: str, result: Dict[str, Any]):
+    try:
+        os.makedirs(ASR_CACHE_DIR, exist_ok=True)
+        path = os.path.join(ASR_CACHE_DIR, f"{cache_key}.json")
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+        # Keep the directory bounded, dropping the least recently used entries first
+        entries = sorted(os.scandir(ASR_CACHE_DIR), key=lambda e: e.stat().st_mtime)
+        for entry in entries[:-MAX_ASR_CACHE_ENTRIES]:
+            os.unlink(entry.path)
+    except Exception as e:
+        vprint(f"[yellow]⚠️ Failed to cache transcription: {e}[/yellow]")
+
+
+def clear_disk_cache():
+    """Remove all cached cloud transcriptions"""
+    shutil.rmtree(ASR_CACHE_DIR, ignore_errors=True)
+
+
+# Cache keys currently being transcribed, so concurrent identical requests upload only once
+_INFLIGHT: Dict[str, threading.Event] = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+
+def _claim_inflight(cache_key: str) -> Optional[threading.Event]:
+    """Return None if the caller should send the request, else the Event of the request already in flight"""
+    with _INFLIGHT_LOCK:
+        if cache_key in _INFLIGHT:
+            return _INFLIGHT[cache_key]
+        _INFLIGHT[cache_key] = threading.Event()
+        return None
+
+
+def _release_inflight(cache_key: str):
+    with _INFLIGHT_LOCK:
+        _INFLIGHT.pop(cache_key).set()
+
+
+def get_audio_duration(audio_file: str) -> float:
+    """Get the duration of an audio file in seconds using ffprobe"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', audio_file],
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip())
+
+
+def read_audio_window(audio_file: str, start: float, end: float, codec: str = UPLOAD_CODEC) -> Tuple[str, bytes, str]:
+    """
+    Read the [start, end] window of an audio file for upload
+    
+    Args:
+        codec: 'opus' or 'flac' for a cut window; a whole-file window is sent unchanged
+    
+    Returns:
+        (filename, audio bytes, content type); the returned audio starts at `start`
+    """
+    if start <= 0 and end - start >= get_audio_duration(audio_file) * 0.99:
+        # The window is the whole file, send it as-is
+        with open(audio_file, 'rb') as f:
+            content_type = mimetypes.guess_type(audio_file)[0] or 'application/octet-stream'
+            return os.path.basename(audio_file), f.read(), content_type
+    
+    # Cut just this window as 16kHz mono (what the server resamples to anyway),
+    # instead of re-uploading the whole file for every chunk
+    cut = ['ffmpeg', '-v', 'error', '-ss', f'{start:.3f}', '-t', f'{end - start:.3f}', '-i', audio_file,
+           '-vn', '-ac', '1', '-ar', '16000']
+    name = f"segment_{start:.0f}_{end:.0f}"
+    
+    if codec == "opus":
+        # 24 kbps Opus in speech mode costs Whisper very little accuracy at ~1/10 of the bytes;
+        # the server decodes Ogg/Opus through libsndfile like any other upload
+        try:
+            ogg = subprocess.run(
+                # bitexact: otherwise the Ogg muxer picks a random stream serial, so identical windows
+                # encode to different bytes and miss the server's audio-hash cache
+                cut + ['-c:a', 'libopus', '-b:a', '24k', '-application', 'voip',
+                       '-fflags', '+bitexact', '-flags:a', '+bitexact', '-f', 'ogg', 'pipe:1'],
+                capture_output=True, check=True
+            ).stdout
+            return f"{name}.ogg", ogg, 'audio/ogg'
+        except subprocess.CalledProcessError as e:
+            vprint(f"[yellow]⚠️ Opus encoding failed, uploading FLAC instead: {e.stderr.decode(errors='ignore').strip()}[/yellow]")
+    
+    pcm = subprocess.run(cut + ['-f', 's16le', 'pipe:1'], capture_output=True, check=True).stdout
+    # FLAC is lossless and about half the size of WAV on speech
+    buf = io.BytesIO()
+    sf.write(buf, np.frombuffer(pcm, dtype=np.int16), 16000, format='FLAC', subtype='PCM_16')
+    return f"{name}.flac", buf.getvalue(), 'audio/flac'
 
 
 def get_cloud_url() -> str:
@@ -95,7 +257,7 @@ def check_cloud_connection(url: str = None, timeout: int = 10) -> Dict[str, Any]
     
     for attempt in range(MAX_RETRIES):
         try:
-            response = requests.get(f"{url}/", timeout=timeout)
+            response = _SESSION.get(f"{url}/", timeout=timeout)
             if response.status_code == 200:
                 data = response.json()
                 vprint(f"[green]✅ Cloud WhisperX connected:[/green] {url}")
@@ -109,13 +271,13 @@ def check_cloud_connection(url: str = None, timeout: int = 10) -> Dict[str, Any]
         except requests.exceptions.Timeout:
             if attempt < MAX_RETRIES - 1:
                 vprint(f"[yellow]⚠️ Connection timeout, retrying... ({attempt + 1}/{MAX_RETRIES})[/yellow]")
-                time.sleep(RETRY_DELAY)
+                time.sleep(_retry_delay(attempt))
             else:
                 return {'available': False, 'error': 'Connection timeout'}
         except Exception as e:
             if attempt < MAX_RETRIES - 1:
                 vprint(f"[yellow]⚠️ Connection error, retrying... ({attempt + 1}/{MAX_RETRIES})[/yellow]")
-                time.sleep(RETRY_DELAY)
+                time.sleep(_retry_delay(attempt))
             else:
                 return {'available': False, 'error': str(e)}
     
@@ -133,7 +295,9 @@ def transcribe_audio_cloud(
     align: bool = True,
     speaker_diarization: bool = False,
     timeout: int = DEFAULT_TIMEOUT,
-    token: str = None
+    token: str = None,
+    batch_size: Optional[int] = None,
+    codec: str = UPLOAD_CODEC
 ) -> Dict[str, Any]:
     """
     Transcribe audio segment using cloud WhisperX API
@@ -150,6 +314,8 @@ def transcribe_audio_cloud(
         speaker_diarization: Enable speaker diarization
         timeout: Request timeout in seconds
         token: Authentication token
+        batch_size: Whisper batch size (default: picked by the server from free GPU memory)
+        codec: Upload format for a cut window, 'opus' or 'flac'
     
     Returns:
         Dictionary with segments and word-level timestamps
@@ -165,6 +331,13 @@ def transcribe_audio_cloud(
     if not os.path.exists(audio_file):
         raise FileNotFoundError(f"Audio file not found: {audio_file}")
     
+    # Key on the source, not the encoded upload, so a cache hit skips the ffmpeg encode too
+    cache_key = get_asr_cache_key(audio_file, start, end, codec, language, model, align, speaker_diarization)
+    cached = load_asr_cache(cache_key)
+    if cached is not None:
+        vprint(f"[green]♻️ Cache hit, skipping upload:[/green] {start:.2f}s - {end:.2f}s")
+        return cached
+    
     vprint(f"[green]🚀 Sending to cloud WhisperX:[/green] {url}")
     vprint(f"[cyan]⏱️ Segment:[/cyan] {start:.2f}s - {end:.2f}s")
     
@@ -184,37 +357,47 @@ def transcribe_audio_cloud(
     if token:
         headers['Authorization'] = f"Bearer {token}"
     
-    last_error = None
-    for attempt in range(MAX_RETRIES):
-        try:
-            # Prepare the audio file
-            with open(audio_file, 'rb') as f:
-                files = {'audio': (os.path.basename(audio_file), f, 'audio/wav')}
+    # Wait for an identical request already in flight; if it failed, the next waiter sends its own
+    while (inflight := _claim_inflight(cache_key)) is not None:
+        vprint(f"[cyan]⏳ Same segment already uploading, waiting:[/cyan] {start:.2f}s - {end:.2f}s")
+        inflight.wait()
+        cached = load_asr_cache(cache_key)
+        if cached is not None:
+            return cached
+    
+    try:
+        filename, audio_bytes, content_type = read_audio_window(audio_file, start, end, codec)
+        last_error = None
+        for attempt in range(MAX_RETRIES):
+            try:
+                files = {'audio': (filename, audio_bytes, content_type)}
                 data = {
                     'language': language if language else '',
                     'model': model,
                     'align': str(align).lower(),
                     'speaker_diarization': str(speaker_diarization).lower()
                 }
-                
+                if batch_size:
+                    data['batch_size'] = str(batch_size)
+            
                 # Make request
-                response = requests.post(
+                response = _SESSION.post(
                     f"{url}/asr/transcribe",
                     files=files,
                     data=data,
                     timeout=timeout,
                     headers=headers
                 )
-                
+            
                 if response.status_code != 200:
                     error_msg = response.text
                     raise Exception(f"API Error {response.status_code}: {error_msg}")
-                
+            
                 result = response.json()
-                
+            
                 if not result.get('success'):
                     raise Exception(f"Transcription failed: {result}")
-                
+            
                 # Adjust timestamps back to original
                 segments = result.get('segments', [])
                 for segment in segments:
@@ -226,35 +409,39 @@ def transcribe_audio_cloud(
                                 word['start'] += start
                             if 'end' in word:
                                 word['end'] += start
-                
+            
                 vprint(f"[green]✅ Transcription complete![/green]")
                 vprint(f"[cyan]Language:[/cyan] {result.get('language', 'unknown')}")
                 vprint(f"[cyan]Processing time:[/cyan] {result.get('processing_time', 0):.2f}s")
                 vprint(f"[cyan]Device:[/cyan] {result.get('device', 'unknown')}")
                 vprint(f"[cyan]Platform:[/cyan] {result.get('platform', 'unknown')}")
-                
-                return {
+            
+                output = {
                     'language': result.get('language', 'en'),
                     'segments': segments
                 }
-                
-        except requests.exceptions.Timeout:
-            last_error = f"Cloud API timeout after {timeout}s"
-            vprint(f"[yellow]⚠️ Attempt {attempt + 1}/{MAX_RETRIES} timed out[/yellow]")
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
-        except requests.exceptions.ConnectionError:
-            last_error = f"Cannot connect to cloud API at {url}"
-            vprint(f"[yellow]⚠️ Attempt {attempt + 1}/{MAX_RETRIES} connection failed[/yellow]")
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
-        except Exception as e:
-            last_error = str(e)
-            vprint(f"[yellow]⚠️ Attempt {attempt + 1}/{MAX_RETRIES} failed: {last_error}[/yellow]")
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
-    
-    raise Exception(f"Cloud transcription failed after {MAX_RETRIES} attempts: {last_error}")
+                save_asr_cache(cache_key, output)
+                return output
+            
+            except requests.exceptions.Timeout:
+                last_error = f"Cloud API timeout after {timeout}s"
+                vprint(f"[yellow]⚠️ Attempt {attempt + 1}/{MAX_RETRIES} timed out[/yellow]")
+                if attempt < MAX_RETRIES - 1:
+                    time.sleep(_retry_delay(attempt))
+            except requests.exceptions.ConnectionError:
+                last_error = f"Cannot connect to cloud API at {url}"
+                vprint(f"[yellow]⚠️ Attempt {attempt + 1}/{MAX_RETRIES} connection failed[/yellow]")
+                if attempt < MAX_RETRIES - 1:
+                    time.sleep(_retry_delay(attempt))
+            except Exception as e:
+                last_error = str(e)
+                vprint(f"[yellow]⚠️ Attempt {attempt + 1}/{MAX_RETRIES} failed: {last_error}[/yellow]")
+                if attempt < MAX_RETRIES - 1:
+                    time.sleep(_retry_delay(attempt))
+    
+        raise Exception(f"Cloud transcription failed after {MAX_RETRIES} attempts: {last_error}")
+    finally:
+        _release_inflight(cache_key)
 
 
 class VideoLingoCloudClient:
@@ -425,7 +612,10 @@ def transcribe_audio_cloud_compatible(
         cloud_url=cloud_url,
         language=whisper_language if whisper_language != 'auto' else None,
         model=model,
-        token=token
+        token=token,
+        # A queued chunk waits for the one ahead of it on the server's GPU before its own
+        # transcription starts, so allow for the whole queue instead of a single request
+        timeout=DEFAULT_TIMEOUT * CLOUD_ASR_CONCURRENCY
     )
 
 
@@ -461,37 +651,50 @@ def separate_audio_cloud(
         
     vprint(f"[green]🚀 Sending to cloud Demucs:[/green] {url}")
     
-    with open(audio_file, 'rb') as f:
-        files = {'audio': (os.path.basename(audio_file), f, 'audio/wav')}
-        data = {'return_files': 'true'}
-        
-        response = requests.post(
-            f"{url}/separation/separate",
-            files=files,
-            data=data,
-            timeout=300,
-            headers=headers
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"API Error {response.status_code}: {response.text}")
-        
-        result = response.json()
-        if not result.get('success'):
-            raise Exception(f"Separation failed: {result}")
-            
-        # Decode and save
-        if result.get('vocals_base64'):
-            os.makedirs(os.path.dirname(vocals_output) or '.', exist_ok=True)
-            with open(vocals_output, 'wb') as f:
-                f.write(base64.b64decode(result['vocals_base64']))
-            vprint(f"[green]✅ Vocals saved[/green]")
+    def _post_once():
+        # Open per attempt so a retry never resends a partially consumed stream,
+        # and close the upload before the (large) response is decoded
+        with open(audio_file, 'rb') as f:
+            files = {'audio': (os.path.basename(audio_file), f, 'audio/wav')}
+            return _SESSION.post(
+                f"{url}/separation/separate",
+                files=files,
+                data={'return_files': 'true'},
+                timeout=300,
+                headers=headers
+            )
+    
+    last_error = None
+    for attempt in range(MAX_RETRIES):
+        try:
+            response = _post_once()
+            if response.status_code != 200:
+                raise Exception(f"API Error {response.status_code}: {response.text}")
             
-        if result.get('background_base64'):
-            os.makedirs(os.path.dirname(background_output) or '.', exist_ok=True)
-            with open(background_output, 'wb') as f:
-                f.write(base64.b64decode(result['background_base64']))
-            vprint(f"[green]✅ Background saved[/green]")
+            result = response.json()
+            if not result.get('success'):
+                raise Exception(f"Separation failed: {result}")
+            break
+        except Exception as e:
+            last_error = str(e)
+            vprint(f"[yellow]⚠️ Attempt {attempt + 1}/{MAX_RETRIES} failed: {last_error}[/yellow]")
+            if attempt < MAX_RETRIES - 1:
+                time.sleep(_retry_delay(attempt))
+    else:
+        raise Exception(f"Cloud separation failed after {MAX_RETRIES} attempts: {last_error}")
+    
+    # Decode and save
+    if result.get('vocals_base64'):
+        os.makedirs(os.path.dirname(vocals_output) or '.', exist_ok=True)
+        with open(vocals_output, 'wb') as f:
+            f.write(base64.b64decode(result['vocals_base64']))
+        vprint(f"[green]✅ Vocals saved[/green]")
+        
+    if result.get('background_base64'):
+        os.makedirs(os.path.dirname(background_output) or '.', exist_ok=True)
+        with open(background_output, 'wb') as f:
+            f.write(base64.b64decode(result['background_base64']))
+        vprint(f"[green]✅ Background saved[/green]")
 
 
 def get_server_info(url: str = None) -> Dict[str, Any]:
@@ -5,21 +5,16 @@ Compatible with VideoLingo project
 """
 
 # Server version
-SERVER_VERSION = "1.3.0"
+SERVER_VERSION = "1.4.0"
 
 import os
-import builtins
 # Set matplotlib backend to Agg before importing any matplotlib-dependent libraries
 os.environ['MPLBACKEND'] = 'Agg'
 
-# Monkey patch builtins.open to ensure all file operations use the same settings
-_original_open = open
-def _patched_open(*args, **kwargs):
-    return _original_open(*args, **kwargs)
-builtins.open = _patched_open
-
 import io
+import asyncio
 import base64
+import shutil
 import tempfile
 import warnings
 import time
@@ -27,6 +22,7 @@ from typing import Optional, Union, Any
 from contextlib import asynccontextmanager
 
 import torch
+import torchaudio
 
 # Patch torch.load to disable weights_only restriction for PyTorch 2.6+
 _original_torch_load = torch.load
@@ -37,18 +33,18 @@ def _patched_torch_load(*args, **kwargs):
 # Replace torch.load in the torch module
 torch.load = _patched_torch_load
 
-# Also patch in builtins to catch any direct imports
-import sys
-sys.modules['torch'].load = _patched_torch_load
-
 import whisperx
 import librosa
+import soundfile as sf
 import numpy as np
 from fastapi import FastAPI, File, UploadFile, HTTPException, Security, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel, Field
 import uvicorn
+from collections import OrderedDict
+import gc
 
 # ============== Logging ==============
 try:
@@ -82,16 +78,24 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Security(security))
     return True
 
 # Global model cache
-model_cache = {}
-align_model_cache = {}
+# Each Whisper model (one per language) pins ~3GB of VRAM for large-v3; keep only the most recently used
+model_cache = OrderedDict()
+# Alignment models are wav2vec2 checkpoints (~0.4-1.2GB each); keep the most recently used few on device
+align_model_cache = OrderedDict()
+MAX_ALIGN_MODELS = 3
 diarize_model_cache = {}
 device = None
 compute_type = None
+# Whisper model preloaded at startup
+DEFAULT_MODEL = os.environ.get("DEFAULT_MODEL", "large-v3")
+# Requests decode on worker threads concurrently, but share one GPU for inference
+gpu_lock = asyncio.Lock()
 
 def get_device():
     """智能设备检测: CUDA -> MPS (Apple Silicon) -> CPU"""
     if torch.cuda.is_available():
-        return "cuda", "float16" if torch.cuda.is_bf16_supported() else "int8"
+        # bfloat16 on Ampere+ (same speed as float16 with float32's range); T4/V100 stay on float16
+        return "cuda", "bfloat16" if torch.cuda.get_device_capability(0)[0] >= 8 else "float16"
     elif torch.backends.mps.is_available():
         return "mps", "float16"
     else:
@@ -149,9 +153,13 @@ async def lifespan(app: FastAPI):
     vprint(f"📌 WhisperX Cloud Server v{SERVER_VERSION}")
     vprint(f"   With PyTorch weights_only patch for PyTorch 2.6+ compatibility\n")
 
-    # Preload models
+    device, compute_type = get_device()
+    vprint(f"⚙️ Device: {device}, compute type: {compute_type}\n")
+
+    # Preload models so the first request doesn't pay the load on top of its own transcription
     vprint("📦 Preloading models...")
-    get_or_load_model("large-v3")
+    load_start = time.time()
+    get_or_load_model(DEFAULT_MODEL)
     
     try:
         get_or_load_align_model("en")
@@ -164,7 +172,7 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         vprint(f"⚠️ Failed to preload diarization model: {e}")
         
-    vprint("✅ All models loaded!\n")
+    vprint(f"✅ All models loaded in {time.time() - load_start:.1f}s!\n")
 
     yield
 
@@ -192,11 +200,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Word-level JSON compresses several times over; requests sends Accept-Encoding: gzip by default.
+# Level 1 keeps compressing large transcription responses cheap, since it runs on the event loop
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=1)
+
+def evict_whisper_models(cache: OrderedDict):
+    """Drop least recently used Whisper models so a new one fits (2 on CUDA, 1 elsewhere)"""
+    max_models = 2 if device == "cuda" else 1
+    if len(cache) < max_models:
+        return
+    while len(cache) >= max_models:
+        # Delete by key rather than popitem() so no local keeps the evicted model alive
+        evicted = next(iter(cache))
+        del cache[evicted]
+        vprint(f"🗑️ Evicting Whisper model: {evicted}")
+    gc.collect()
+    if device == "cuda":
+        torch.cuda.empty_cache()
+
 def get_or_load_model(model_name: str, language: Optional[str] = None, batch_size: int = 16):
     """Load or retrieve cached model"""
     cache_key = f"{model_name}_{language}_{compute_type}"
     
-    if cache_key not in model_cache:
+    if cache_key in model_cache:
+        model_cache.move_to_end(cache_key)
+    else:
+        evict_whisper_models(model_cache)
         vprint(f"📥 Loading model: {model_name}...")
         vad_options = {"vad_onset": 0.500, "vad_offset": 0.363}
         asr_options = {"temperatures": [0], "initial_prompt": ""}
@@ -215,8 +244,18 @@ def get_or_load_model(model_name: str, language: Optional[str] = None, batch_siz
     return model_cache[cache_key]
 
 def get_or_load_align_model(language_code: str):
-    """Load or retrieve cached alignment model"""
-    if language_code not in align_model_cache:
+    """Load or retrieve cached alignment model (LRU, at most MAX_ALIGN_MODELS)"""
+    if language_code in align_model_cache:
+        align_model_cache.move_to_end(language_code)
+    else:
+        if len(align_model_cache) >= MAX_ALIGN_MODELS:
+            # Delete by key rather than popitem() so no local keeps the evicted model alive through the load
+            evicted = next(iter(align_model_cache))
+            del align_model_cache[evicted]
+            vprint(f"🗑️ Evicting alignment model: {evicted}")
+            gc.collect()
+            if device == "cuda":
+                torch.cuda.empty_cache()
         vprint(f"📥 Loading alignment model for: {language_code}...")
         align_model, align_metadata = whisperx.load_align_model(
             language_code=language_code, device=device
@@ -236,19 +275,101 @@ def get_or_load_diarize_model():
         vprint(f"✅ Diarization model loaded")
     return diarize_model_cache['diarize']
 
-def process_audio(audio_bytes: bytes):
-    """Load and preprocess audio"""
-    # Save to temp file
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-        tmp.write(audio_bytes)
-        tmp_path = tmp.name
-    
+def process_audio(audio_file):
+    """Load and preprocess audio from a binary file object (e.g. UploadFile.file)"""
     try:
-        # Load audio at 16kHz
-        audio, sr = librosa.load(tmp_path, sr=16000, mono=True)
-        return audio
-    finally:
-        os.unlink(tmp_path)
+        # Decode straight from the upload (wav/flac/ogg, and mp3 with libsndfile >= 1.1)
+        audio, sr = sf.read(audio_file, dtype='float32', always_2d=False)
+    except RuntimeError:
+        # Formats libsndfile can't read (m4a, aac, ...) decode in-process through torchaudio's sox/ffmpeg bindings
+        audio_file.seek(0)
+        try:
+            wav, sr = torchaudio.load(audio_file)
+            audio = wav.numpy().T
+        except Exception:
+            # Last resort: librosa's audioread path spawns ffmpeg and needs a file on disk
+            audio_file.seek(0)
+            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+                shutil.copyfileobj(audio_file, tmp)
+                tmp_path = tmp.name
+            try:
+                audio, sr = librosa.load(tmp_path, sr=16000, mono=True)
+                return audio
+            finally:
+                os.unlink(tmp_path)
+
+    # Same 16kHz mono output librosa.load(sr=16000, mono=True) produced
+    if audio.ndim == 2:
+        audio = audio.mean(axis=1)
+    if sr != 16000:
+        audio = librosa.resample(audio, orig_sr=sr, target_sr=16000)
+    return audio
+
+def default_batch_size() -> int:
+    """Pick the Whisper batch size from the GPU memory free right now, with cached models already resident"""
+    if device == "cuda":
+        free_mem, _ = torch.cuda.mem_get_info()
+        # Blocks held by PyTorch's caching allocator are reusable, so count them as free
+        free_mem += torch.cuda.memory_reserved() - torch.cuda.memory_allocated()
+        free_gb = free_mem / (1024**3)
+        return 32 if free_gb > 20 else 16 if free_gb > 8 else 8 if free_gb > 4 else 4
+    elif device == "mps":
+        return 4
+    return 1
+
+@torch.inference_mode()
+def run_transcription(audio_array, language, model, batch_size, align, speaker_diarization, min_speakers, max_speakers):
+    """Transcribe, align and diarize a decoded 16kHz array (blocking; run on a worker thread)"""
+    # Load model
+    whisper_model = get_or_load_model(model, language, batch_size)
+    if batch_size is None:
+        batch_size = default_batch_size()
+    vprint(f"📐 Batch size: {batch_size}")
+    
+    # Transcribe
+    vprint("🎯 Starting transcription...")
+    result = whisper_model.transcribe(audio_array, batch_size=batch_size)
+    detected_language = result.get("language", language or "unknown")
+    segments = result.get("segments", [])
+    
+    # Word-level alignment
+    word_segments = None
+    if align and segments:
+        vprint("🔄 Aligning words...")
+        align_model, align_metadata = get_or_load_align_model(detected_language)
+        result_aligned = whisperx.align(
+            segments,
+            align_model,
+            align_metadata,
+            audio_array,
+            device,
+            return_char_alignments=False
+        )
+        segments = result_aligned.get("segments", [])
+        word_segments = result_aligned.get("word_segments", [])
+    
+    # Speaker diarization
+    speakers = None
+    if speaker_diarization:
+        vprint("🎭 Performing speaker diarization...")
+        diarize_model = get_or_load_diarize_model()
+        diarize_segments = diarize_model(audio_array, min_speakers=min_speakers, max_speakers=max_speakers)
+        
+        # Create result dict with word segments for speaker assignment
+        result_for_diarization = {"segments": segments}
+        if word_segments:
+            result_for_diarization["word_segments"] = word_segments
+        
+        result_diarized = whisperx.assign_word_speakers(diarize_segments, result_for_diarization)
+        segments = result_diarized.get("segments", [])
+        speakers = list(set(seg.get("speaker", "UNKNOWN") for seg in segments if "speaker" in seg))
+        
+        if speakers:
+            vprint(f"✅ Detected speakers: {speakers}")
+        else:
+            vprint("⚠️ No speakers detected")
+    
+    return detected_language, segments, word_segments, speakers
 
 @app.get("/", response_model=HealthResponse)
 async def health_check():
@@ -301,66 +422,16 @@ async def transcribe(
     align = parse_bool(align)
     speaker_diarization = parse_bool(speaker_diarization)
     
-    # Determine batch size based on device
-    if batch_size is None:
-        if device == "cuda":
-            gpu_mem = torch.cuda.get_device_properties(0).total_memory / (1024**3)
-            batch_size = 16 if gpu_mem > 8 else 4
-        elif device == "mps":
-            batch_size = 4  # MPS建议使用较小的batch_size
-        else:
-            batch_size = 1  # CPU模式使用最小batch_size
-    
     try:
-        # Read audio file
-        audio_bytes = await audio.read()
-        audio_array = process_audio(audio_bytes)
+        loop = asyncio.get_running_loop()
+        # Decode on a worker thread so the event loop keeps receiving uploads and answering health checks
+        audio_array = await loop.run_in_executor(None, process_audio, audio.file)
         
-        # Load model
-        whisper_model = get_or_load_model(model, language, batch_size)
-        
-        # Transcribe
-        vprint("🎯 Starting transcription...")
-        result = whisper_model.transcribe(audio_array, batch_size=batch_size)
-        detected_language = result.get("language", language or "unknown")
-        segments = result.get("segments", [])
-        
-        # Word-level alignment
-        word_segments = None
-        if align and segments:
-            vprint("🔄 Aligning words...")
-            align_model, align_metadata = get_or_load_align_model(detected_language)
-            result_aligned = whisperx.align(
-                segments,
-                align_model,
-                align_metadata,
-                audio_array,
-                device,
-                return_char_alignments=False
+        async with gpu_lock:
+            detected_language, segments, word_segments, speakers = await loop.run_in_executor(
+                None, run_transcription, audio_array, language, model, batch_size,
+                align, speaker_diarization, min_speakers, max_speakers
             )
-            segments = result_aligned.get("segments", [])
-            word_segments = result_aligned.get("word_segments", [])
-        
-        # Speaker diarization
-        speakers = None
-        if speaker_diarization:
-            vprint("🎭 Performing speaker diarization...")
-            diarize_model = get_or_load_diarize_model()
-            diarize_segments = diarize_model(audio_array, min_speakers=min_speakers, max_speakers=max_speakers)
-            
-            # Create result dict with word segments for speaker assignment
-            result_for_diarization = {"segments": segments}
-            if word_segments:
-                result_for_diarization["word_segments"] = word_segments
-            
-            result_diarized = whisperx.assign_word_speakers(diarize_segments, result_for_diarization)
-            segments = result_diarized.get("segments", [])
-            speakers = list(set(seg.get("speaker", "UNKNOWN") for seg in segments if "speaker" in seg))
-            
-            if speakers:
-                vprint(f"✅ Detected speakers: {speakers}")
-            else:
-                vprint("⚠️ No speakers detected")
         
         processing_time = time.time() - start_time
 
@@ -379,9 +450,6 @@ async def transcribe(
     except Exception as e:
         vprint(f"❌ Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if device == "cuda":
-            torch.cuda.empty_cache()
 
 @app.post("/transcribe/base64")
 async def transcribe_base64(request: TranscriptionRequest):
@@ -410,4 +478,6 @@ if __name__ == "__main__":
     # For local testing
     port = int(os.environ.get("PORT", 8000))
     host = os.environ.get("HOST", "0.0.0.0")
-    uvicorn.run(app, host=host, port=port)
+    # Single worker: the models live in this process's GPU memory. Keep idle connections open
+    # between VideoLingo's chunk requests instead of uvicorn's 5s default
+    uvicorn.run(app, host=host, port=port, workers=1, timeout_keep_alive=75)